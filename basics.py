@@ -1,64 +1,66 @@
+import math
+import operator
+
+G = 6.67430e-11  # Gravitational constant, m^3 kg^-1 s^-2
+
+
 class Vector:
   def __init__(self, *components):
     """Initialize a vector with its components."""
     self.components = components
 
+  @classmethod
+  def _from_components(cls, components):
+    """Build a vector from an existing tuple without re-packing *args."""
+    vector = cls.__new__(cls)
+    vector.components = components
+    return vector
+
   def __repr__(self):
     """Unambiguous string representation of the vector."""
     return f"Vector{self.components}"
 
   def __add__(self, other):
     """Add two vectors."""
-    if len(self.components) != len(other.components):
-      raise ValueError("Vectors must have the same dimensions to add.")
-    added_components = tuple(a + b for a, b in zip(self.components, other.components))
-    return Vector(*added_components)
+    assert len(self.components) == len(other.components), "Vectors must have the same dimensions to add."
+    return Vector._from_components(tuple(map(operator.add, self.components, other.components)))
 
   def __sub__(self, other):
     """Subtract one vector from another."""
-    if len(self.components) != len(other.components):
-      raise ValueError("Vectors must have the same dimensions to subtract.")
-    subtracted_components = tuple(a - b for a, b in zip(self.components, other.components))
-    return Vector(*subtracted_components)
+    assert len(self.components) == len(other.components), "Vectors must have the same dimensions to subtract."
+    return Vector._from_components(tuple(map(operator.sub, self.components, other.components)))
 
   def __mul__(self, scalar):
     """Multiply vector by a scalar."""
-    multiplied_components = tuple(a * scalar for a in self.components)
-    return Vector(*multiplied_components)
+    return Vector._from_components(tuple([a * scalar for a in self.components]))
 
   def __rmul__(self, scalar):
     """Support scalar multiplication from the left."""
     return self.__mul__(scalar)
 
   def __truediv__(self, scalar):
-    """Divide vector by a scalar."""
-    if scalar == 0:
-      raise ValueError("Cannot divide by zero.")
-    divided_components = tuple(a / scalar for a in self.components)
-    return Vector(*divided_components)
+    """Divide vector by a scalar. Dividing by zero raises ZeroDivisionError."""
+    return Vector._from_components(tuple([a / scalar for a in self.components]))
 
   def magnitude(self):
       """Calculate the magnitude (length) of the vector."""
-      return (sum(a**2 for a in self.components))**(0.5)
+      return math.hypot(*self.components)
 
   def normalize(self):
     """Return a normalized version of the vector."""
     mag = self.magnitude()
     if mag == 0:
       raise ValueError("Cannot normalize the zero vector.")
-    normalized_components = tuple(a / mag for a in self.components)
-    return Vector(*normalized_components)
+    return Vector._from_components(tuple([a / mag for a in self.components]))
 
   def dot(self, other):
       """Calculate the dot product with another vector."""
-      if len(self.components) != len(other.components):
-          raise ValueError("Vectors must have the same dimensions for dot product.")
-      return sum(a * b for a, b in zip(self.components, other.components))
+      assert len(self.components) == len(other.components), "Vectors must have the same dimensions for dot product."
+      return sum(map(operator.mul, self.components, other.components))
 
   def cross(self, other):
     """Calculate the cross product with another vector (3D vectors only)."""
-    if len(self.components) != 3 or len(other.components) != 3:
-      raise ValueError("Cross product is defined only for 3-dimensional vectors.")
+    assert len(self.components) == 3 and len(other.components) == 3, "Cross product is defined only for 3-dimensional vectors."
     a1, a2, a3 = self.components
     b1, b2, b3 = other.components
     cross_components = (
@@ -66,7 +68,88 @@ class Vector:
       a3 * b1 - a1 * b3,
       a1 * b2 - a2 * b1
     )
-    return Vector(*cross_components)
+    return Vector._from_components(cross_components)
+
+  def angle_with(self, other):
+    """Calculate the angle between this vector and another in radians."""
+    dot_prod = self.dot(other)
+    mags = self.magnitude() * other.magnitude()
+    if mags == 0:
+      raise ValueError("Cannot calculate angle with zero vector.")
+    # Clamp the cosine value to the valid range to avoid numerical errors
+    cos_angle = max(min(dot_prod / mags, 1), -1)
+    return math.acos(cos_angle)
+
+  def projection_onto(self, other):
+    """Project this vector onto another vector."""
+    # Scale by dot(self, other) / |other|^2 directly; no normalize() and no sqrt
+    other_mag_sq = other.dot(other)
+    if other_mag_sq == 0:
+      raise ValueError("Cannot project onto the zero vector.")
+    return other * (self.dot(other) / other_mag_sq)
+
+
+class Vector3:
+  """A 3-dimensional vector with unrolled arithmetic for the physics hot paths."""
+  __slots__ = ('x', 'y', 'z')
+
+  def __init__(self, x, y, z):
+    """Initialize a 3D vector with its components."""
+    self.x = x
+    self.y = y
+    self.z = z
+
+  @property
+  def components(self):
+    """The components as a tuple, for compatibility with Vector."""
+    return (self.x, self.y, self.z)
+
+  def __repr__(self):
+    """Unambiguous string representation of the vector."""
+    return f"Vector3({self.x!r}, {self.y!r}, {self.z!r})"
+
+  def __add__(self, other):
+    """Add two vectors."""
+    return Vector3(self.x + other.x, self.y + other.y, self.z + other.z)
+
+  def __sub__(self, other):
+    """Subtract one vector from another."""
+    return Vector3(self.x - other.x, self.y - other.y, self.z - other.z)
+
+  def __mul__(self, scalar):
+    """Multiply vector by a scalar."""
+    return Vector3(self.x * scalar, self.y * scalar, self.z * scalar)
+
+  def __rmul__(self, scalar):
+    """Support scalar multiplication from the left."""
+    return Vector3(self.x * scalar, self.y * scalar, self.z * scalar)
+
+  def __truediv__(self, scalar):
+    """Divide vector by a scalar. Dividing by zero raises ZeroDivisionError."""
+    return Vector3(self.x / scalar, self.y / scalar, self.z / scalar)
+
+  def magnitude(self):
+    """Calculate the magnitude (length) of the vector."""
+    return (self.x * self.x + self.y * self.y + self.z * self.z)**0.5
+
+  def normalize(self):
+    """Return a normalized version of the vector."""
+    mag = self.magnitude()
+    if mag == 0:
+      raise ValueError("Cannot normalize the zero vector.")
+    return Vector3(self.x / mag, self.y / mag, self.z / mag)
+
+  def dot(self, other):
+    """Calculate the dot product with another vector."""
+    return self.x * other.x + self.y * other.y + self.z * other.z
+
+  def cross(self, other):
+    """Calculate the cross product with another vector."""
+    return Vector3(
+      self.y * other.z - self.z * other.y,
+      self.z * other.x - self.x * other.z,
+      self.x * other.y - self.y * other.x
+    )
 
   def angle_with(self, other):
     """Calculate the angle between this vector and another in radians."""
@@ -76,51 +159,107 @@ class Vector:
       raise ValueError("Cannot calculate angle with zero vector.")
     # Clamp the cosine value to the valid range to avoid numerical errors
     cos_angle = max(min(dot_prod / mags, 1), -1)
-    # return math.acos(cos_angle)
+    return math.acos(cos_angle)
 
   def projection_onto(self, other):
     """Project this vector onto another vector."""
-    other_normalized = other.normalize()
-    projection_length = self.dot(other_normalized)
-    return other_normalized * projection_length
+    # Scale by dot(self, other) / |other|^2 directly; no normalize() and no sqrt
+    other_mag_sq = other.dot(other)
+    if other_mag_sq == 0:
+      raise ValueError("Cannot project onto the zero vector.")
+    return other * (self.dot(other) / other_mag_sq)
+
 
+def cross_batch(vectors_a, vectors_b):
+  """
+  Calculate the pairwise cross products of two sequences of 3D vectors given
+  as (x, y, z) tuples, without wrapping each one in a Vector.
+  """
+  if len(vectors_a) != len(vectors_b):
+    raise ValueError("Both sequences must contain the same number of vectors.")
+  return [
+    (a2 * b3 - a3 * b2, a3 * b1 - a1 * b3, a1 * b2 - a2 * b1)
+    for (a1, a2, a3), (b1, b2, b3) in zip(vectors_a, vectors_b)
+  ]
 
 
-v1 = Vector(1, 2, 3)
-v2 = Vector(4, 5, 6)
+
+v1 = Vector3(1, 2, 3)
+v2 = Vector3(4, 5, 6)
 
 mag_v1 = v1.magnitude()
 print(mag_v1)  # Output: 3.7416573867739413
 
 v1_normalized = v1.normalize()
 print(v1_normalized)
-# Output: Vector(0.2672612419124244, 0.5345224838248488, 0.8017837257372732)
+# Output: Vector3(0.2672612419124244, 0.5345224838248488, 0.8017837257372732)
 
 dot_product = v1.dot(v2)
 print(dot_product)  # Output: 32
 
 v7 = v1.cross(v2)
-print(v7)  # Output: Vector(-3, 6, -3)
+print(v7)  # Output: Vector3(-3, 6, -3)
+
+crosses = cross_batch([(1, 2, 3), (1, 0, 0)], [(4, 5, 6), (0, 1, 0)])
+print(crosses)  # Output: [(-3, 6, -3), (0, 0, 1)]
 
 
 def gravitational_force(m1, m2, position1, position2):
     """Calculate the gravitational force vector exerted on m1 by m2."""
-    G = 6.67430e-11  # m^3 kg^-1 s^-2
     displacement = position2 - position1
-    distance = displacement.magnitude()
-    if distance == 0:
+    distance_sq = displacement.dot(displacement)
+    if distance_sq == 0:
         raise ValueError("Positions must be different to calculate gravitational force.")
-    force_magnitude = G * m1 * m2 / distance**2
-    force_vector = displacement.normalize() * force_magnitude
-    return force_vector
+    # Scale the displacement by G*m1*m2 / r^3 instead of normalizing it first
+    inv_distance = distance_sq**-0.5
+    return displacement * (G * m1 * m2 * inv_distance * inv_distance * inv_distance)
 
 mass1 = 5.972e24  # Mass of Earth in kg
 mass2 = 7.348e22  # Mass of Moon in kg
-pos_earth = Vector(0, 0, 0)
-pos_moon = Vector(384400000, 0, 0)  # Distance from Earth to Moon in meters
+pos_earth = Vector3(0, 0, 0)
+pos_moon = Vector3(384400000, 0, 0)  # Distance from Earth to Moon in meters
 
 force = gravitational_force(mass1, mass2, pos_earth, pos_moon)
 print(force)
-# Output: Vector(1.982110729079252e+20, 0.0, 0.0)
+# Output: Vector3(1.9821107290792523e+20, 0.0, 0.0)
+
+
+
 
+def gravitational_forces(masses, positions, softening=0.0):
+    """
+    Calculate the net gravitational force on every body of an N-body system.
+    positions are (x, y, z) tuples; the forces are returned in the same form.
+    A non-zero softening length smooths the force at small separations.
+    """
+    n = len(masses)
+    if len(positions) != n:
+        raise ValueError("Each body needs exactly one mass and one position.")
+    softening_sq = softening * softening
+    fx = [0.0] * n
+    fy = [0.0] * n
+    fz = [0.0] * n
+    # Visit each pair once and apply the force to both bodies (Newton's third law)
+    for i in range(n):
+        xi, yi, zi = positions[i]
+        gmi = G * masses[i]
+        for j in range(i + 1, n):
+            xj, yj, zj = positions[j]
+            dx = xj - xi
+            dy = yj - yi
+            dz = zj - zi
+            r_sq = dx * dx + dy * dy + dz * dz + softening_sq
+            if r_sq == 0:
+                raise ValueError("Positions must be different to calculate gravitational force.")
+            scale = gmi * masses[j] / (r_sq * r_sq**0.5)
+            fx[i] += dx * scale
+            fy[i] += dy * scale
+            fz[i] += dz * scale
+            fx[j] -= dx * scale
+            fy[j] -= dy * scale
+            fz[j] -= dz * scale
+    return list(zip(fx, fy, fz))
 
+forces = gravitational_forces([mass1, mass2], [(0, 0, 0), (384400000, 0, 0)])
+print(forces)
+# Output: [(1.982110729079252e+20, 0.0, 0.0), (-1.982110729079252e+20, 0.0, 0.0)]
@@ -1,34 +1,31 @@
 
 import os
 import struct
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-def read_bmp(file_path):
+# BITMAPFILEHEADER followed by BITMAPINFOHEADER (54 bytes)
+_BMP_HEADER_STRUCT = struct.Struct('<2sIHHIIIIHHIIIIII')
+
+# Precompiled RIFF/AVI layouts, so the format strings are parsed only once
+_U32 = struct.Struct('<I')  # Chunk sizes
+_FRAME_HDR = struct.Struct('<4sI')  # Frame chunk ID and size
+_IDX = struct.Struct('<4sII')  # idx1 entry: chunk ID, flags, offset
+
+def read_bmp_bgr(file_path):
     """
-    Reads a 24-bit BMP file and returns the pixel data in RGB format.
+    Reads a 24-bit BMP file and returns its pixel data as stored: bottom-up
+    rows of BGR pixels, with the row padding removed.
     """
     with open(file_path, "rb") as f:
-        # Read BMP Header
-        header_field = f.read(2)
-        if header_field != b'BM':
+        # Read the BMP file header and DIB header in one go
+        header = f.read(_BMP_HEADER_STRUCT.size)
+        if len(header) < _BMP_HEADER_STRUCT.size or header[:2] != b'BM':
             raise ValueError(f"{file_path} is not a BMP file.")
-
-        file_size = struct.unpack('<I', f.read(4))[0]
-        reserved1 = struct.unpack('<H', f.read(2))[0]
-        reserved2 = struct.unpack('<H', f.read(2))[0]
-        offset = struct.unpack('<I', f.read(4))[0]
-
-        # Read DIB Header
-        dib_header_size = struct.unpack('<I', f.read(4))[0]
-        width = struct.unpack('<I', f.read(4))[0]
-        height = struct.unpack('<I', f.read(4))[0]
-        planes = struct.unpack('<H', f.read(2))[0]
-        bit_count = struct.unpack('<H', f.read(2))[0]
-        compression = struct.unpack('<I', f.read(4))[0]
-        image_size = struct.unpack('<I', f.read(4))[0]
-        x_ppm = struct.unpack('<I', f.read(4))[0]
-        y_ppm = struct.unpack('<I', f.read(4))[0]
-        clr_used = struct.unpack('<I', f.read(4))[0]
-        clr_important = struct.unpack('<I', f.read(4))[0]
+        (header_field, file_size, reserved1, reserved2, offset,
+         dib_header_size, width, height, planes, bit_count, compression,
+         image_size, x_ppm, y_ppm, clr_used, clr_important) = _BMP_HEADER_STRUCT.unpack(header)
 
         if bit_count != 24:
             raise ValueError(f"{file_path} is not a 24-bit BMP file.")
@@ -40,54 +37,93 @@ def read_bmp(file_path):
         row_padded = (width * 3 + 3) & ~3
         raw_data = f.read(row_padded * height)
 
-        # Convert BMP to top-down RGB
-        pixel_data = bytearray()
-        for row in range(height):
-            row_start = row * row_padded
-            row_end = row_start + (width * 3)
-            row_data = raw_data[row_start:row_end]
-            # BMP stores in BGR format; convert to RGB
-            for i in range(0, len(row_data), 3):
-                b, g, r = row_data[i:i+3]
-                pixel_data += bytes([r, g, b])
-        return pixel_data
+    # Strip the row padding (a no-op when rows are already 4-byte aligned)
+    row_size = width * 3
+    if row_padded == row_size:
+        return raw_data
+    return b''.join(raw_data[row_start:row_start + row_size]
+                    for row_start in range(0, row_padded * height, row_padded))
 
 
-def pad_to_even(data):
+def read_bmp(file_path):
     """
-    Pads the data to ensure its length is even.
+    Reads a 24-bit BMP file and returns the pixel data in RGB format.
     """
-    if len(data) % 2 != 0:
-        return data + b'\x00'
-    return data
+    bgr_data = read_bmp_bgr(file_path)
+
+    # BMP stores in BGR format; convert to RGB by permuting the channels
+    # with extended slice assignment instead of a per-pixel loop
+    pixel_data = bytearray(len(bgr_data))
+    pixel_data[0::3] = bgr_data[2::3]
+    pixel_data[1::3] = bgr_data[1::3]
+    pixel_data[2::3] = bgr_data[0::3]
+    return pixel_data
 
 
-def create_avi(frames_dir, output_avi, frame_rate=30):
+def create_avi(frames_dir, output_avi, frame_rate=30, max_workers=8):
     """
     Creates an uncompressed AVI file from BMP frames located in frames_dir.
+    Frames are read concurrently by up to max_workers threads.
     """
     # Collect and sort BMP frame files
     frame_files = sorted([f for f in os.listdir(frames_dir) if f.lower().endswith('.bmp')])
     if not frame_files:
         raise ValueError("No BMP files found in the specified directory.")
 
-    # Read all frames
-    frames = []
-    print("Reading BMP frames...")
-    for frame_file in frame_files:
-        frame_path = os.path.join(frames_dir, frame_file)
-        pixel_data = read_bmp(frame_path)
-        frames.append(pixel_data)
-
-    num_frames = len(frames)
-    if num_frames == 0:
-        raise ValueError("No frames to process.")
-
-    # Assume all frames are the same size
-    frame_size = len(frames[0])
     width = 200  # Update this if your frames have a different width
     height = 200  # Update this if your frames have a different height
 
+    # Read the frames as stored (BGR), which is what a DIB video stream expects
+    frame_paths = [os.path.join(frames_dir, frame_file) for frame_file in frame_files]
+    print("Reading BMP frames...")
+    frames = read_frames_concurrently(frame_paths, max_workers)
+    create_avi_from_arrays(frames, output_avi, width, height, frame_rate)
+
+
+def read_frames_concurrently(frame_paths, max_workers):
+    """
+    Reads BMP frames on a thread pool and yields their BGR pixel data in order.
+    File reads release the GIL, so threads overlap the I/O. At most
+    2 * max_workers reads are in flight at once, which bounds memory use
+    (executor.map would submit every read up front).
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        paths = iter(frame_paths)
+        pending = deque(executor.submit(read_bmp_bgr, path)
+                        for path in itertools.islice(paths, 2 * max_workers))
+        while pending:
+            frame = pending.popleft().result()
+            next_path = next(paths, None)
+            if next_path is not None:
+                pending.append(executor.submit(read_bmp_bgr, next_path))
+            yield frame
+
+
+def write_gathered(avi, parts):
+    """
+    Writes a list of bytes-like parts to an unbuffered file without joining
+    them first. Where available, os.writev gathers them into one system call.
+    Short writes are resumed from the exact byte where they stopped.
+    """
+    views = deque(memoryview(part) for part in parts)
+    while views:
+        if hasattr(os, 'writev'):
+            written = os.writev(avi.fileno(), views)
+        else:
+            written = avi.write(views[0])
+        # Drop the parts that were written in full and trim a partial one
+        while views and written >= len(views[0]):
+            written -= len(views[0])
+            views.popleft()
+        if written:
+            views[0] = views[0][written:]
+
+
+def build_hdrl_list(num_frames, width, height, frame_rate):
+    """
+    Builds the 'hdrl' LIST chunk. Its size does not depend on num_frames,
+    so it can be rewritten in place once the frame count is known.
+    """
     # AVI Main Header (avih)
     microsec_per_frame = int(1e6 / frame_rate)
     max_bytes_per_sec = width * height * 3 * frame_rate  # Uncompressed
@@ -173,70 +209,103 @@ def create_avi(frames_dir, output_avi, frame_rate=30):
                        bi_clr_important)
 
     # Construct 'hdrl' LIST chunk
-    avih_chunk = b'avih' + struct.pack('<I', len(avih)) + avih
-    strh_chunk = b'strh' + struct.pack('<I', len(strh)) + strh
-    strf_chunk = b'strf' + struct.pack('<I', len(strf)) + strf
-    strl_list = b'LIST' + struct.pack('<I', 4 + len(strh_chunk) + len(strf_chunk)) + b'strl' + strh_chunk + strf_chunk
-    hdrl_list = b'LIST' + struct.pack('<I', 4 + len(avih_chunk) + len(strl_list)) + b'hdrl' + avih_chunk + strl_list
-
-    # Construct 'movi' LIST chunk
-    movi_list = bytearray()
-    movi_list += b'movi'
-
-    # To create the index, keep track of each frame's byte offset within 'movi'
-    idx_entries = []
+    avih_chunk = b'avih' + _U32.pack(len(avih)) + avih
+    strh_chunk = b'strh' + _U32.pack(len(strh)) + strh
+    strf_chunk = b'strf' + _U32.pack(len(strf)) + strf
+    strl_list = b'LIST' + _U32.pack(4 + len(strh_chunk) + len(strf_chunk)) + b'strl' + strh_chunk + strf_chunk
+    hdrl_list = b'LIST' + _U32.pack(4 + len(avih_chunk) + len(strl_list)) + b'hdrl' + avih_chunk + strl_list
+
+    return hdrl_list
+
+
+def write_avi_stream(avi, frames, width, height, frame_rate):
+    """
+    Writes a complete AVI file to avi, an unbuffered file opened for writing,
+    consuming frames one at a time. Returns the number of frames written.
+    """
+    chunk_id = b'00dc'  # Video frame
+
+    # Each frame entry in idx1: (4s, I, I)
+    # 4s: chunk ID
+    # I: flags (0x10 for key frame)
+    # I: offset (relative to 'movi' list start)
+    idx1 = bytearray()
     movi_data_offset = 0  # Relative to start of 'movi' data
+    num_frames = 0
+
+    # Write RIFF header with placeholder for file size
+    write_gathered(avi, [b'RIFF', _U32.pack(0), b'AVI '])
+
+    # Write 'hdrl' LIST; the frame counts are patched in at the end
+    hdrl_pos = avi.tell()
+    write_gathered(avi, [build_hdrl_list(0, width, height, frame_rate)])
+
+    # Write 'movi' LIST header with placeholder for its size
+    movi_size_pos = avi.tell() + 4
+    movi_start = movi_size_pos + 4
+    write_gathered(avi, [b'LIST', _U32.pack(0), b'movi'])  # Size placeholder
 
-    print("Assembling 'movi' LIST chunk...")
-    for i, frame in enumerate(frames):
-        chunk_id = b'00dc'  # Video frame
-        frame_data = frame
-        frame_size = len(frame_data)
-        frame_chunk = chunk_id + struct.pack('<I', frame_size) + frame_data
-        frame_chunk = pad_to_even(frame_chunk)
-        movi_list += frame_chunk
-
-        # Each frame entry in idx1: (4s, I, I)
-        # 4s: chunk ID
-        # I: flags (0x10 for key frame)
-        # I: offset (relative to 'movi' list start)
-        idx_entry = struct.pack('<4sII', chunk_id, 0x10, movi_data_offset)
-        idx_entries.append(idx_entry)
+    print("Writing 'movi' LIST chunk...")
+    for frame in frames:
+        # Each frame chunk is an 8-byte header plus the data, padded to even length
+        frame_size = len(frame)
+        parts = [_FRAME_HDR.pack(chunk_id, frame_size), frame]
+        if frame_size & 1:
+            parts.append(b'\x00')
+        write_gathered(avi, parts)
+
+        idx1 += _IDX.pack(chunk_id, 0x10, movi_data_offset)
 
         # Update offset: each frame chunk size
-        movi_data_offset += len(frame_chunk)
+        movi_data_offset += _FRAME_HDR.size + frame_size + (frame_size & 1)
 
-        if (i + 1) % 100 == 0:
-            print(f"{i + 1} frames added to 'movi' LIST.")
+        num_frames += 1
+        if num_frames % 100 == 0:
+            print(f"{num_frames} frames added to 'movi' LIST.")
+    movi_end = avi.tell()
 
-    movi_chunk = b'LIST' + struct.pack('<I', len(movi_list)) + movi_list
+    # Write 'idx1' chunk
+    write_gathered(avi, [b'idx1', _U32.pack(len(idx1)), idx1])
 
-    # Construct 'idx1' chunk
-    idx1 = bytearray()
-    for entry in idx_entries:
-        idx1 += entry
-    idx1_chunk = b'idx1' + struct.pack('<I', len(idx1)) + idx1
-
-    # Write the AVI file
-    with open(output_avi, 'wb') as avi:
-        # Write RIFF header with placeholder for file size
-        avi.write(b'RIFF')
-        avi.write(struct.pack('<I', 0))  # Placeholder
-        avi.write(b'AVI ')
-
-        # Write 'hdrl' LIST
-        avi.write(hdrl_list)
-
-        # Write 'movi' LIST
-        avi.write(movi_chunk)
-
-        # Write 'idx1' chunk
-        avi.write(idx1_chunk)
-
-        # Calculate the total file size
-        file_size = avi.tell() - 8  # Exclude 'RIFF' and size field
-        avi.seek(4)
-        avi.write(struct.pack('<I', file_size))  # Update file size
+    # Calculate the total file size
+    file_size = avi.tell() - 8  # Exclude 'RIFF' and size field
+    avi.seek(4)
+    write_gathered(avi, [_U32.pack(file_size)])  # Update file size
+
+    # Patch the 'movi' LIST size and the frame counts in 'hdrl'
+    avi.seek(movi_size_pos)
+    write_gathered(avi, [_U32.pack(movi_end - movi_start)])
+    avi.seek(hdrl_pos)
+    write_gathered(avi, [build_hdrl_list(num_frames, width, height, frame_rate)])
+
+    return num_frames
+
+
+def create_avi_from_arrays(frames, output_avi, width, height, frame_rate=30):
+    """
+    Creates an uncompressed AVI file from in-memory frames.
+    Each frame is the raw bottom-up BGR pixel data of a 24-bit DIB, i.e. the
+    same layout as the pixel array of a BMP file.
+    frames may be any iterable (e.g. a generator); each frame is written to
+    disk as soon as it is produced, so the writer itself holds only one frame
+    at a time. If writing fails, the partial file is removed.
+    """
+    frames = iter(frames)
+    first_frame = next(frames, None)
+    if first_frame is None:
+        raise ValueError("No frames to process.")
+
+    # Write the AVI file. It is opened unbuffered so that frames go straight
+    # from their buffers to the file, with no intermediate copies.
+    with open(output_avi, 'wb', buffering=0) as avi:
+        try:
+            num_frames = write_avi_stream(avi, itertools.chain((first_frame,), frames),
+                                          width, height, frame_rate)
+        except BaseException:
+            # Do not leave a truncated AVI with placeholder sizes behind
+            avi.close()
+            os.remove(output_avi)
+            raise
 
     print(f"AVI file '{output_avi}' created successfully with {num_frames} frames.")
 
@@ -1,7 +1,12 @@
 import os
 import math
 import random
-import struct
+import importlib
+import itertools
+from collections import defaultdict
+
+# frames-to-avi.py is not a valid identifier, so it is loaded by name
+frames_to_avi = importlib.import_module("frames-to-avi")
 
 # -------------------------
 # Configuration Constants
@@ -12,31 +17,23 @@ PARTICLE_RADIUS = 5      # Radius of particles in pixels
 TIME_STEP = 1            # Time step for the simulation
 NUM_FRAMES = 1000        # Number of frames to simulate
 FRAME_DIR = "./frames"   # Directory to save BMP frames
+SAVE_BMP_FRAMES = False  # Also write every frame as a BMP file to FRAME_DIR
+OUTPUT_AVI = "./output.avi"  # AVI file written directly from the frames
+FRAME_RATE = 30          # Frames per second of the AVI file
 
 # -------------------------
-# Particle Class Definition
+# Particle Container Definition
 # -------------------------
-class Particle:
-    """Represents a particle with position and velocity."""
+class Particles:
+    """
+    Holds the state of all particles as parallel lists (structure of arrays)
+    instead of one Python object per particle.
+    """
     def __init__(self, x, y, vx, vy):
-        self.x = x  # X-coordinate
-        self.y = y  # Y-coordinate
-        self.vx = vx  # Velocity in X
-        self.vy = vy  # Velocity in Y
-
-    def update_position(self):
-        """Updates the particle's position based on its velocity."""
-        self.x += self.vx * TIME_STEP
-        self.y += self.vy * TIME_STEP
-
-    def handle_wall_collisions(self):
-        """Reverses velocity if particle collides with the walls."""
-        if self.x - PARTICLE_RADIUS < 0 or self.x + PARTICLE_RADIUS > BOX_SIZE:
-            self.vx *= -1
-            self.x = max(PARTICLE_RADIUS, min(self.x, BOX_SIZE - PARTICLE_RADIUS))
-        if self.y - PARTICLE_RADIUS < 0 or self.y + PARTICLE_RADIUS > BOX_SIZE:
-            self.vy *= -1
-            self.y = max(PARTICLE_RADIUS, min(self.y, BOX_SIZE - PARTICLE_RADIUS))
+        self.x = x  # X-coordinates
+        self.y = y  # Y-coordinates
+        self.vx = vx  # Velocities in X
+        self.vy = vy  # Velocities in Y
 
 # -------------------------
 # Utility Functions
@@ -47,94 +44,179 @@ def create_frames_directory(path):
 
 def initialize_particles():
     """Initializes particles with random positions and velocities."""
-    particles = []
+    xs, ys, vxs, vys = [], [], [], []
     for _ in range(NUM_PARTICLES):
-        x = random.uniform(PARTICLE_RADIUS, BOX_SIZE - PARTICLE_RADIUS)
-        y = random.uniform(PARTICLE_RADIUS, BOX_SIZE - PARTICLE_RADIUS)
-        vx = random.uniform(-1, 1)
-        vy = random.uniform(-1, 1)
-        particles.append(Particle(x, y, vx, vy))
-    return particles
-
-def precompute_circle_mask(radius):
-    """Precomputes the relative positions within a circle to optimize rendering."""
-    mask = []
-    for dx in range(-radius, radius + 1):
-        for dy in range(-radius, radius + 1):
-            if dx**2 + dy**2 <= radius**2:
-                mask.append((dx, dy))
-    return mask
-
-def handle_particle_collisions(particles):
+        xs.append(random.uniform(PARTICLE_RADIUS, BOX_SIZE - PARTICLE_RADIUS))
+        ys.append(random.uniform(PARTICLE_RADIUS, BOX_SIZE - PARTICLE_RADIUS))
+        vxs.append(random.uniform(-1, 1))
+        vys.append(random.uniform(-1, 1))
+    return Particles(xs, ys, vxs, vys)
+
+def precompute_circle_spans(radius):
+    """
+    Precomputes the circle as horizontal spans so each row can be drawn
+    with a single slice assignment. Returns (dy, half_width) pairs.
+    """
+    return [(dy, math.isqrt(radius**2 - dy**2)) for dy in range(-radius, radius + 1)]
+
+def precompute_flat_spans(circle_spans):
+    """
+    Precomputes each circle span as byte offsets relative to the circle's
+    centre pixel in the padded BMP pixel array, together with its blue fill
+    bytes. Returns (start_offset, end_offset, fill) tuples.
+    """
+    padded_row_size = (BOX_SIZE * 3 + 3) & ~3  # Each row is padded to multiple of 4 bytes
+    blue = b'\xFF\x00\x00'  # Blue in BGR
+    flat_spans = []
+    for dy, half_width in circle_spans:
+        start_offset = dy * padded_row_size - half_width * 3
+        end_offset = dy * padded_row_size + (half_width + 1) * 3
+        flat_spans.append((start_offset, end_offset, blue * (2 * half_width + 1)))
+    return flat_spans
+
+def advance_particles(xs, ys, vxs, vys):
+    """
+    Moves every particle one time step and reverses its velocity if it
+    collides with the walls, in a single pass over the state lists.
+    """
+    low = PARTICLE_RADIUS
+    high = BOX_SIZE - PARTICLE_RADIUS
+    dt = TIME_STEP
+    for i in range(len(xs)):
+        x = xs[i] + vxs[i] * dt
+        if x < low or x > high:
+            vxs[i] = -vxs[i]
+            x = max(low, min(x, high))
+        xs[i] = x
+        y = ys[i] + vys[i] * dt
+        if y < low or y > high:
+            vys[i] = -vys[i]
+            y = max(low, min(y, high))
+        ys[i] = y
+
+def find_candidate_pairs(xs, ys, cell_size):
+    """
+    Bins particles into a uniform grid and returns the sorted (i, j) index
+    pairs, i < j, of particles in the same or adjacent cells. With a cell
+    size of at least the collision distance, every colliding pair is included.
+    """
+    cells = defaultdict(list)
+    for i, (x, y) in enumerate(zip(xs, ys)):
+        cells[(int(x // cell_size), int(y // cell_size))].append(i)
+
+    pairs = []
+    for (cx, cy), members in cells.items():
+        pairs.extend(itertools.combinations(members, 2))
+        # Visit only half of the neighbouring cells so each pair is found once
+        for ox, oy in ((1, -1), (1, 0), (1, 1), (0, 1)):
+            neighbors = cells.get((cx + ox, cy + oy))
+            if neighbors:
+                for i in members:
+                    for j in neighbors:
+                        pairs.append((i, j) if i < j else (j, i))
+    # Resolve collisions in the same order as an all-pairs scan
+    pairs.sort()
+    return pairs
+
+def handle_particle_collisions(xs, ys, vxs, vys):
     """Handles elastic collisions between particles."""
-    for i in range(len(particles)):
-        for j in range(i + 1, len(particles)):
-            p1 = particles[i]
-            p2 = particles[j]
-            dx = p1.x - p2.x
-            dy = p1.y - p2.y
-            distance = math.hypot(dx, dy)
-            if distance < 2 * PARTICLE_RADIUS:
-                # Normalize the collision vector
-                if distance == 0:
-                    # Prevent division by zero; apply a small random displacement
-                    angle = random.uniform(0, 2 * math.pi)
-                    dx = math.cos(angle)
-                    dy = math.sin(angle)
-                    distance = 1e-6
-                nx = dx / distance
-                ny = dy / distance
-
-                # Relative velocity
-                dvx = p1.vx - p2.vx
-                dvy = p1.vy - p2.vy
-                # Dot product of relative velocity and collision normal
-                dot = dvx * nx + dvy * ny
-                if dot > 0:
-                    continue  # Particles are moving away from each other
-
-                # Exchange velocities along the normal direction
-                p1.vx -= dot * nx
-                p1.vy -= dot * ny
-                p2.vx += dot * nx
-                p2.vy += dot * ny
-
-                # Adjust positions to prevent overlap
-                overlap = 2 * PARTICLE_RADIUS - distance
-                p1.x += nx * (overlap / 2)
-                p1.y += ny * (overlap / 2)
-                p2.x -= nx * (overlap / 2)
-                p2.y -= ny * (overlap / 2)
-
-def generate_frame(particles, circle_mask):
+    sqrt = math.sqrt
+    collision_distance = 2 * PARTICLE_RADIUS
+    collision_distance_sq = collision_distance * collision_distance
+    for i, j in find_candidate_pairs(xs, ys, collision_distance):
+        dx = xs[i] - xs[j]
+        dy = ys[i] - ys[j]
+        # Compare squared distances so the sqrt is only taken for actual collisions
+        distance_sq = dx * dx + dy * dy
+        if distance_sq < collision_distance_sq:
+            # Normalize the collision vector
+            if distance_sq == 0:
+                # Prevent division by zero; apply a small random displacement
+                angle = random.uniform(0, 2 * math.pi)
+                dx = math.cos(angle)
+                dy = math.sin(angle)
+                distance = 1e-6
+            else:
+                distance = sqrt(distance_sq)
+            inv_distance = 1.0 / distance
+            nx = dx * inv_distance
+            ny = dy * inv_distance
+
+            # Relative velocity
+            dvx = vxs[i] - vxs[j]
+            dvy = vys[i] - vys[j]
+            # Dot product of relative velocity and collision normal
+            dot = dvx * nx + dvy * ny
+            if dot > 0:
+                continue  # Particles are moving away from each other
+
+            # Exchange velocities along the normal direction
+            vxs[i] -= dot * nx
+            vys[i] -= dot * ny
+            vxs[j] += dot * nx
+            vys[j] += dot * ny
+
+            # Adjust positions to prevent overlap
+            overlap = collision_distance - distance
+            xs[i] += nx * (overlap / 2)
+            ys[i] += ny * (overlap / 2)
+            xs[j] -= nx * (overlap / 2)
+            ys[j] -= ny * (overlap / 2)
+
+def step(particles):
+    """Advances the whole particle system by one time step."""
+    xs, ys, vxs, vys = particles.x, particles.y, particles.vx, particles.vy
+    advance_particles(xs, ys, vxs, vys)
+    handle_particle_collisions(xs, ys, vxs, vys)
+
+def create_blank_frame():
+    """Creates the BMP pixel array of an all-white frame, including row padding."""
+    row_size = BOX_SIZE * 3
+    padded_row_size = (row_size + 3) & ~3  # Each row is padded to multiple of 4 bytes
+    return (b'\xFF' * row_size + b'\x00' * (padded_row_size - row_size)) * BOX_SIZE
+
+def generate_frame(particles, circle_spans, flat_spans, pixels, blank_frame):
     """
-    Generates a single frame as raw BMP pixel data.
+    Renders a single frame directly into pixels, a writable buffer laid out
+    as a BMP pixel array (padded rows), so it can be written out as-is.
     Particles are rendered as blue circles on a white background.
     """
-    # Initialize image data to white
-    image = bytearray([255] * (BOX_SIZE * BOX_SIZE * 3))
+    # Reset the image to white
+    pixels[:] = blank_frame
+    padded_row_size = (BOX_SIZE * 3 + 3) & ~3
+    blue = b'\xFF\x00\x00'  # Blue in BGR
+    radius = len(circle_spans) // 2
+    low = radius
+    high = BOX_SIZE - radius
+
+    for particle_x, particle_y in zip(particles.x, particles.y):
+        px, py = int(particle_x), int(particle_y)
+        if low <= px < high and low <= py < high:
+            # The whole circle is inside the frame: stamp the precomputed spans
+            base = py * padded_row_size + px * 3
+            for start_offset, end_offset, fill in flat_spans:
+                pixels[base + start_offset:base + end_offset] = fill
+            continue
 
-    for particle in particles:
-        px, py = int(particle.x), int(particle.y)
-        for dx, dy in circle_mask:
-            x = px + dx
+        # Near an edge: clip every row of the circle to the frame
+        for dy, half_width in circle_spans:
             y = py + dy
-            if 0 <= x < BOX_SIZE and 0 <= y < BOX_SIZE:
-                index = (y * BOX_SIZE + x) * 3
-                # Set pixel to blue (B, G, R)
-                image[index:index+3] = b'\xFF\x00\x00'  # Blue in BGR
-    return bytes(image)
-
-def save_frame_as_bmp(frame_data, frame_number, output_dir):
-    """Saves a single frame as a BMP file with correct padding."""
-    file_path = os.path.join(output_dir, f"frame_{frame_number:04d}.bmp")
-    
-    # BMP Header
-    file_size = 54 + (BOX_SIZE * 3 + (4 - (BOX_SIZE * 3) % 4) % 4) * BOX_SIZE
-    bmp_header = struct.pack(
-        '<2sIHHIIIIHHIIIIII',
+            if not 0 <= y < BOX_SIZE:
+                continue
+            x_start = max(px - half_width, 0)
+            x_end = min(px + half_width + 1, BOX_SIZE)
+            if x_start < x_end:
+                # Fill the whole clipped row of the circle in one slice
+                row_index = y * padded_row_size
+                pixels[row_index + x_start * 3:row_index + x_end * 3] = blue * (x_end - x_start)
+
+def create_bmp_header():
+    """Packs the BMP file and DIB headers, which are identical for every frame."""
+    padded_row_size = (BOX_SIZE * 3 + 3) & ~3  # Each row is padded to multiple of 4 bytes
+    image_size = padded_row_size * BOX_SIZE
+    return frames_to_avi._BMP_HEADER_STRUCT.pack(
         b'BM',                 # Signature
-        file_size,             # File size
+        54 + image_size,       # File size
         0,                     # Reserved1
         0,                     # Reserved2
         54,                    # Pixel data offset
@@ -144,52 +226,68 @@ def save_frame_as_bmp(frame_data, frame_number, output_dir):
         1,                     # Planes
         24,                    # Bits per pixel
         0,                     # Compression
-        (BOX_SIZE * 3 + (4 - (BOX_SIZE * 3) % 4) % 4) * BOX_SIZE,  # Image size
+        image_size,            # Image size
         2835,                  # X pixels per meter
         2835,                  # Y pixels per meter
         0,                     # Total colors
         0                      # Important colors
     )
 
-    # BMP Data with row padding
-    padded_row_size = (BOX_SIZE * 3 + 3) & ~3  # Each row is padded to multiple of 4 bytes
-    padding = b'\x00' * (padded_row_size - BOX_SIZE * 3)
-    bmp_data = bytearray()
-    for row in range(BOX_SIZE):
-        start = row * BOX_SIZE * 3
-        bmp_data += frame_data[start:start + BOX_SIZE * 3] + padding
-
-    # Write BMP file
+def save_frame_as_bmp(frame_buffer, frame_number, output_dir):
+    """Saves a frame buffer (BMP header followed by the padded pixel array) as a BMP file."""
+    file_path = os.path.join(output_dir, f"frame_{frame_number:04d}.bmp")
     with open(file_path, "wb") as bmp_file:
-        bmp_file.write(bmp_header + bmp_data)
+        bmp_file.write(frame_buffer)
     print(f"Saved {file_path}")
 
 # -------------------------
 # Main Simulation Loop
 # -------------------------
-def main():
-    # Initialize
-    create_frames_directory(FRAME_DIR)
-    particles = initialize_particles()
-    circle_mask = precompute_circle_mask(PARTICLE_RADIUS)
-    
-    print("Starting simulation...")
+def simulate(particles, circle_spans, flat_spans, frame_buffer, blank_frame):
+    """
+    Runs the simulation, yielding the pixel data of each frame as it is generated.
+    Frames are yielded without BMP row padding, matching read_bmp_bgr and the
+    frame size declared in the AVI headers. When no padding is needed the
+    yielded frame is a view of frame_buffer, which every frame is rendered
+    into, so it is only valid until the next one is requested.
+    """
+    pixels = memoryview(frame_buffer)[frames_to_avi._BMP_HEADER_STRUCT.size:]
+    row_size = BOX_SIZE * 3
+    padded_row_size = (row_size + 3) & ~3
     for frame_num in range(1, NUM_FRAMES + 1):
         # Update particle states
-        for particle in particles:
-            particle.update_position()
-            particle.handle_wall_collisions()
-        
-        handle_particle_collisions(particles)
+        step(particles)
         
         # Generate and save frame
-        frame_data = generate_frame(particles, circle_mask)
-        save_frame_as_bmp(frame_data, frame_num, FRAME_DIR)
+        generate_frame(particles, circle_spans, flat_spans, pixels, blank_frame)
+        if SAVE_BMP_FRAMES:
+            save_frame_as_bmp(frame_buffer, frame_num, FRAME_DIR)
         
         # Progress update
         if frame_num % 100 == 0 or frame_num == NUM_FRAMES:
-            print(f"Frame {frame_num}/{NUM_FRAMES} processed and saved.")
+            print(f"Frame {frame_num}/{NUM_FRAMES} processed.")
+        if padded_row_size == row_size:
+            yield pixels
+        else:
+            yield b''.join(pixels[start:start + row_size]
+                           for start in range(0, len(pixels), padded_row_size))
+
+def main():
+    # Initialize
+    if SAVE_BMP_FRAMES:
+        create_frames_directory(FRAME_DIR)
+    particles = initialize_particles()
+    circle_spans = precompute_circle_spans(PARTICLE_RADIUS)
+    flat_spans = precompute_flat_spans(circle_spans)
+    # One reusable buffer holding the constant BMP header and the pixel array
+    blank_frame = create_blank_frame()
+    frame_buffer = bytearray(create_bmp_header() + blank_frame)
     
+    print("Starting simulation...")
+    # The frames are already BGR pixel arrays, so no BMP round trip is needed;
+    # each one is streamed into the AVI file as soon as it is generated
+    frames = simulate(particles, circle_spans, flat_spans, frame_buffer, blank_frame)
+    frames_to_avi.create_avi_from_arrays(frames, OUTPUT_AVI, BOX_SIZE, BOX_SIZE, FRAME_RATE)
     print("Simulation completed.")
 
 if __name__ == "__main__":